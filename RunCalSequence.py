@@ -23,10 +23,18 @@ pass them to RunCalSequence.
 import ktl
 
 import argparse
+import errno
 import logging
-from time import sleep
-from pathlib import Path
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep, monotonic
 import yaml
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
 
 KPFError = Exception
@@ -39,7 +47,6 @@ log = logging.getLogger('RunCalSequence')
 log.setLevel(logging.DEBUG)
 ## Set up console output
 LogConsoleHandler = logging.StreamHandler()
-LogConsoleHandler.setLevel(logging.DEBUG)
 LogFormat = logging.Formatter('%(asctime)s %(levelname)8s: %(message)s',
                               datefmt='%Y-%m-%d %H:%M:%S')
 LogConsoleHandler.setFormatter(LogFormat)
@@ -52,38 +59,167 @@ log.addHandler(LogConsoleHandler)
 # log.addHandler(LogFileHandler)
 
 
+##-------------------------------------------------------------------------
+## KTL services and frequently used keywords
+##-------------------------------------------------------------------------
+_SERVICES = {name: ktl.cache(name)
+             for name in ('kpfexpose', 'kpfmot', 'kpfpower')}
+_EXPOSE = _SERVICES['kpfexpose']['EXPOSE']
+_EXPOSURE = _SERVICES['kpfexpose']['EXPOSURE']
+
+## EXPOSE values expected just after an exposure has been started
+_VALID_EXPOSE_STATES = frozenset(('Start', 'InProgress', 'End', 'Readout'))
+
+
+def _write(keyword, value, pending=None):
+    '''Writes value to a KTL keyword.  If a pending list is given, the write
+    is issued without waiting for it to complete and the (keyword, sequence
+    number) pair is appended to the list so the caller can wait on it later.
+    '''
+    if pending is None:
+        keyword.write(value)
+    else:
+        pending.append((keyword, keyword.write(value, wait=False)))
+
+
+## Names of the kpfpower outlets as read from their _NAME keywords
+_PORT_NAME_CACHE = {}
+
+
+def _port_name(port):
+    '''Returns the name of a kpfpower outlet, reading the _NAME keyword only
+    the first time a given outlet is asked for.
+    '''
+    if port not in _PORT_NAME_CACHE:
+        kpfpower = _SERVICES['kpfpower']
+        _PORT_NAME_CACHE[port] = kpfpower[f"{port}_NAME"].read()
+    return _PORT_NAME_CACHE[port]
+
+## Sequence keys and the corresponding values of the TRIG_TARG,
+## SRC_SHUTTERS, and TIMED_SHUTTERS keywords
+_TRIG_TABLE = (('TriggerRed', 'Red'),
+               ('TriggerGreen', 'Green'),
+               ('TriggerCaHK', 'Ca_HK'),
+               )
+_SSS_TABLE = (('SSS_Science', 'SciSelect'),
+              ('SSS_Sky', 'SkySelect'),
+              ('SSS_SoCalSci', 'SoCalSci'),
+              ('SSS_SoCalCal', 'SoCalCal'),
+              ('SSS_CalSciSky', 'Cal_SciSky'),
+              )
+_TS_TABLE = (('TS_Scrambler', 'Scrambler'),
+             ('TS_SimulCal', 'SimulCal'),
+             ('TS_FF_Fiber', 'FF_Fiber'),
+             ('TS_CaHK', 'Ca_HK'),
+             )
+
+
+## Keyword strings rendered for each selection mask, filled in as needed
+_TRIG_STRINGS = {}
+_SSS_STRINGS = {}
+_TS_STRINGS = {}
+
+
+def _selection_mask(args, mask_key, table):
+    '''Returns a bitmask with bit n set if the nth key in table is True in
+    args.  Sequences loaded by RunCalSequence carry the mask precomputed
+    under mask_key, other args dicts have it computed here.
+    '''
+    mask = args.get(mask_key, None)
+    if mask is None:
+        mask = 0
+        for bit,(key,name) in enumerate(table):
+            if args.get(key, False) is True:
+                mask |= 1 << bit
+    return mask
+
+
+def _selection_string(mask, table, strings):
+    '''Returns the comma separated keyword value selected by mask, caching
+    the result in strings.
+    '''
+    value = strings.get(mask, None)
+    if value is None:
+        value = ','.join(name for bit,(key,name) in enumerate(table)
+                         if mask >> bit & 1)
+        strings[mask] = value
+    return value
+
+
+def _check_selection(keyword, mask, table, label):
+    '''Reads back a comma separated selection keyword and raises KPFError if
+    any entry in table does not match the corresponding bit of mask.
+    '''
+    selected = frozenset(keyword.read().split(','))
+    for bit,(key,name) in enumerate(table):
+        status = name in selected
+        target = bool(mask >> bit & 1)
+        if target != status:
+            msg = f"Final {name} {label} mismatch: {status} != {target}"
+            log.error(msg)
+            raise KPFError(msg)
+
+
+def _wait_for_expose(target, timeout):
+    '''Blocks until the binary value of `kpfexpose.EXPOSE` equals target or
+    until timeout seconds have passed.  Returns True if the target state was
+    reached.
+    '''
+    reached = threading.Event()
+    def check(keyword):
+        if keyword['binary'] == target:
+            reached.set()
+    _EXPOSE.callback(check)
+    try:
+        _EXPOSE.monitor()
+        if _EXPOSE['binary'] == target:
+            return True
+        return reached.wait(timeout)
+    finally:
+        _EXPOSE.callback(check, remove=True)
+
+
 ##-------------------------------------------------------------------------
 ## SetExptime
 ##-------------------------------------------------------------------------
 class SetExptime():
     '''Sets the desired exposure time via the `kpfexpose.EXPOSURE` keyword
+
+    The last value verified is remembered.  If a later sequence asks for
+    the same exposure time and the keyword still reads back that value, the
+    write is skipped.
     '''
     def __init__(self):
-        pass
+        self._last_written = None
 
 
     def pre_condition(self, args):
         pass
 
 
-    def perform(self, args):
+    def perform(self, args, pending=None):
         exptime = args.get('Exptime', None)
         if exptime is not None:
-            log.info(f"  Setting exposure time to {exptime:.1f}")
-            kpfexpose = ktl.cache('kpfexpose')
-            kpfexpose['EXPOSURE'].write(exptime)
+            if (exptime == self._last_written and
+                    math.isclose(_EXPOSURE.read(binary=True), exptime,
+                                 abs_tol=0.1)):
+                log.info("  Exposure time is already %.1f", exptime)
+                return
+            self._last_written = None
+            log.info("  Setting exposure time to %.1f", exptime)
+            _write(_EXPOSURE, exptime, pending)
 
 
     def post_condition(self, args):
-        exptime = args.get('exptime', None)
+        exptime = args.get('Exptime', None)
         if exptime is not None:
-            kpfexpose = ktl.cache('kpfexpose')
-            exptime_value = kpfexpose['EXPOSURE'].read()
-            if abs(exptime_value - exptime) > 0.1:
+            exptime_value = _EXPOSURE.read(binary=True)
+            if not math.isclose(exptime_value, exptime, abs_tol=0.1):
                 msg = (f"Final exposure time mismatch: "
                        f"{exptime_value:.1f} != {exptime:.1f}")
                 log.error(msg)
                 raise KPFError(msg)
+            self._last_written = exptime
         log.info('    Done')
 
 
@@ -110,24 +246,25 @@ class StartExposure():
 
 
     def perform(self, args):
-        kpfexpose = ktl.cache('kpfexpose')
-        expose = kpfexpose['EXPOSE']
-        expose.monitor()
-        if expose > 0:
-            log.info(f"  Detector(s) are currently {expose} waiting for Ready")
-            expose.waitFor('== 0',timeout=300)
-        log.info(f"  Beginning Exposure")
+        expose = _EXPOSE
+        if expose.read(binary=True) > 0:
+            expose.monitor()
+            if expose > 0:
+                log.info("  Detector(s) are currently %s waiting for Ready",
+                         expose)
+                expose.waitFor('== 0',timeout=300)
+        log.info("  Beginning Exposure")
         expose.write('Start')
 
 
     def post_condition(self, args):
-        kpfexpose = ktl.cache('kpfexpose')
-        exptime = kpfexpose['EXPOSURE'].read(binary=True)
-        expose = kpfexpose['EXPOSE'].read()
-        log.debug(f"    exposure time = {exptime:.1f}")
-        log.debug(f"    status = {expose}")
+        exptime = _EXPOSURE.read(binary=True)
+        expose = _EXPOSE.read()
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("    exposure time = %.1f", exptime)
+            log.debug("    status = %s", expose)
         if exptime > 0.1:
-            if expose not in ['Start', 'InProgress', 'End', 'Readout']:
+            if expose not in _VALID_EXPOSE_STATES:
                 msg = f"Unexpected EXPOSE status = {expose}"
                 log.error(msg)
                 raise KPFError(msg)
@@ -157,17 +294,13 @@ class WaitForReadout():
 
 
     def perform(self, args):
-        log.info(f"  Waiting for readout to begin")
-        kpfexpose = ktl.cache('kpfexpose')
-        exptime = kpfexpose['EXPOSURE'].read(binary=True)
-        expose = kpfexpose['EXPOSE']
-        expose.monitor()
-        expose.waitFor('== 4',timeout=exptime+10)
+        log.info("  Waiting for readout to begin")
+        exptime = _EXPOSURE.read(binary=True)
+        _wait_for_expose(4, timeout=exptime+10)
 
 
     def post_condition(self, args):
-        kpfexpose = ktl.cache('kpfexpose')
-        expose = kpfexpose['EXPOSE']
+        expose = _EXPOSE
         status = expose.read()
         if status != 'Readout':
             msg = f"Final detector state mismatch: {status} != Readout"
@@ -199,16 +332,12 @@ class WaitForReady():
 
 
     def perform(self, args):
-        log.info(f"  Waiting for detectors to be ready")
-        kpfexpose = ktl.cache('kpfexpose')
-        expose = kpfexpose['EXPOSE']
-        expose.monitor()
-        expose.waitFor('== 0',timeout=60)
+        log.info("  Waiting for detectors to be ready")
+        _wait_for_expose(0, timeout=60)
 
 
     def post_condition(self, args):
-        kpfexpose = ktl.cache('kpfexpose')
-        expose = kpfexpose['EXPOSE']
+        expose = _EXPOSE
         status = expose.read()
         if status != 'Ready':
             msg = f"Final detector state mismatch: {status} != Ready"
@@ -242,16 +371,21 @@ class PowerOnCalSource():
     - Th_gold
     - BrdbandFiber
     '''
+    ports = {'EtalonFiber': None,
+             'BrdbandFiber': 'OUTLET_CAL2_2',
+             'U_gold': 'OUTLET_CAL2_7',
+             'U_daily': 'OUTLET_CAL2_8',
+             'Th_daily': 'OUTLET_CAL2_6',
+             'Th_gold': 'OUTLET_CAL2_5',
+             'SoCal-CalFib': None,
+             'LFCFiber': None,
+             }
+
     def __init__(self):
-        self.ports = {'EtalonFiber': None,
-                      'BrdbandFiber': 'OUTLET_CAL2_2',
-                      'U_gold': 'OUTLET_CAL2_7',
-                      'U_daily': 'OUTLET_CAL2_8',
-                      'Th_daily': 'OUTLET_CAL2_6',
-                      'Th_gold': 'OUTLET_CAL2_5',
-                      'SoCal-CalFib': None,
-                      'LFCFiber': None,
-                      }
+        kpfpower = _SERVICES['kpfpower']
+        self.lock_keywords = {port: kpfpower[f"{port}_LOCK"]
+                              for port in self.ports.values()
+                              if port is not None}
 
 
     def pre_condition(self, args):
@@ -259,29 +393,29 @@ class PowerOnCalSource():
 
 
     def perform(self, args):
-        kpfpower = ktl.cache('kpfpower')
+        kpfpower = _SERVICES['kpfpower']
         port = self.ports.get(args.get('lamp', None))
         if port is not None:
-            port_name = kpfpower[f"{port}_NAME"].read()
+            port_name = _port_name(port)
             if kpfpower[port].read() == 'On':
-                log.info(f"    Outlet {port} ({port_name}) is already On")
+                log.info("    Outlet %s (%s) is already On", port, port_name)
             else:
-                log.info(f"    Unlocking {port} ({port_name})")
-                kpfpower[f"{port}_LOCK"].write('Unlocked')
-                log.info(f"    Turning on {port} ({port_name})")
+                log.info("    Unlocking %s (%s)", port, port_name)
+                self.lock_keywords[port].write('Unlocked')
+                log.info("    Turning on %s (%s)", port, port_name)
                 kpfpower[port].write('On')
-                log.info(f"    Locking {port} ({port_name})")
-                kpfpower[f"{port}_LOCK"].write('Locked')
+                log.info("    Locking %s (%s)", port, port_name)
+                self.lock_keywords[port].write('Locked')
 
 
     def post_condition(self, args):
         '''Verifies that the relevant power port is actually on.
         '''
-        kpfpower = ktl.cache('kpfpower')
+        kpfpower = _SERVICES['kpfpower']
         port = self.ports.get(args.get('lamp', None))
         if port is not None:
-            port_name = kpfpower[f"{port}_NAME"].read()
-            log.info(f"    Reading {port} ({port_name})")
+            port_name = _port_name(port)
+            log.info("    Reading %s (%s)", port, port_name)
             state = kpfpower[port].read()
             if state != 'On':
                 msg = f"Final power state mismatch: {state} != On"
@@ -315,16 +449,21 @@ class PowerOffCalSource():
     - Th_gold
     - BrdbandFiber
     '''
+    ports = {'EtalonFiber': None,
+             'BrdbandFiber': 'OUTLET_CAL2_2',
+             'U_gold': 'OUTLET_CAL2_7',
+             'U_daily': 'OUTLET_CAL2_8',
+             'Th_daily': 'OUTLET_CAL2_6',
+             'Th_gold': 'OUTLET_CAL2_5',
+             'SoCal-CalFib': None,
+             'LFCFiber': None,
+             }
+
     def __init__(self):
-        self.ports = {'EtalonFiber': None,
-                      'BrdbandFiber': 'OUTLET_CAL2_2',
-                      'U_gold': 'OUTLET_CAL2_7',
-                      'U_daily': 'OUTLET_CAL2_8',
-                      'Th_daily': 'OUTLET_CAL2_6',
-                      'Th_gold': 'OUTLET_CAL2_5',
-                      'SoCal-CalFib': None,
-                      'LFCFiber': None,
-                      }
+        kpfpower = _SERVICES['kpfpower']
+        self.lock_keywords = {port: kpfpower[f"{port}_LOCK"]
+                              for port in self.ports.values()
+                              if port is not None}
 
 
     def pre_condition(self, args):
@@ -332,27 +471,27 @@ class PowerOffCalSource():
 
 
     def perform(self, args):
-        kpfpower = ktl.cache('kpfpower')
+        kpfpower = _SERVICES['kpfpower']
         port = self.ports.get(args.get('lamp', None))
         if port is not None:
-            port_name = kpfpower[f"{port}_NAME"].read()
-            log.info(f"  Powering off {args.lamp}")
-            log.info(f"    Unlocking {port}: {port_name}")
-            kpfpower[f"{port}_LOCK"].write('Unlocked')
-            log.info(f"    Turning on {port}: {port_name}")
+            port_name = _port_name(port)
+            log.info("  Powering off %s", args.get('lamp'))
+            log.info("    Unlocking %s: %s", port, port_name)
+            self.lock_keywords[port].write('Unlocked')
+            log.info("    Turning off %s: %s", port, port_name)
             kpfpower[port].write('Off')
-            log.info(f"    Locking {port}: {port_name}")
-            kpfpower[f"{port}_LOCK"].write('Locked')
+            log.info("    Locking %s: %s", port, port_name)
+            self.lock_keywords[port].write('Locked')
 
 
     def post_condition(self, args):
         '''Verifies that the relevant power port is actually off.
         '''
-        kpfpower = ktl.cache('kpfpower')
+        kpfpower = _SERVICES['kpfpower']
         port = self.ports.get(args.get('lamp', None))
         if port is not None:
-            port_name = kpfpower[f"{port}_NAME"].read()
-            log.info(f"    Reading {port}: {port_name}")
+            port_name = _port_name(port)
+            log.info("    Reading %s: %s", port, port_name)
             state = kpfpower[port].read()
             if state != 'Off':
                 msg = f"Final power state mismatch: {state} != Off"
@@ -386,19 +525,19 @@ class SetCalSource():
         pass
 
 
-    def perform(self, args):
+    def perform(self, args, pending=None):
         target = args.get('OctagonSource', None)
         if target is not None:
-            log.info(f"  Setting Cal Source (Octagon) to {target}")
-            kpfmot = ktl.cache('kpfmot')
-            kpfmot['OCTAGON'].write(target)
+            log.info("  Setting Cal Source (Octagon) to %s", target)
+            kpfmot = _SERVICES['kpfmot']
+            _write(kpfmot['OCTAGON'], target, pending)
 
 
     def post_condition(self, args):
         '''Verifies that the final OCTAGON keyword value matches the input.
         '''
         target = args.get('OctagonSource', None)
-        kpfmot = ktl.cache('kpfmot')
+        kpfmot = _SERVICES['kpfmot']
         final_pos = kpfmot['OCTAGON'].read()
         if final_pos != target:
             msg = f"Final octagon position mismatch: {final_pos} != {target}"
@@ -428,18 +567,18 @@ class SetND1():
         pass
 
 
-    def perform(self, args):
+    def perform(self, args, pending=None):
         ND1_target = args.get('ND1', None)
         if ND1_target is not None:
-            log.info(f"  Setting ND1 to {ND1_target}")
-            kpfmot = ktl.cache('kpfmot')
-            kpfmot['ND1POS'].write(ND1_target)
+            log.info("  Setting ND1 to %s", ND1_target)
+            kpfmot = _SERVICES['kpfmot']
+            _write(kpfmot['ND1POS'], ND1_target, pending)
 
 
     def post_condition(self, args):
         ND1_target = args.get('ND1', None)
         if ND1_target is not None:
-            kpfmot = ktl.cache('kpfmot')
+            kpfmot = _SERVICES['kpfmot']
             final_pos = kpfmot['ND1POS'].read()
             if final_pos != ND1_target:
                 msg = f"Final ND1 position mismatch: {final_pos} != {ND1_target}"
@@ -469,18 +608,18 @@ class SetND2():
         pass
 
 
-    def perform(self, args):
+    def perform(self, args, pending=None):
         ND2_target = args.get('ND2', None)
         if ND2_target is not None:
-            log.info(f"  Setting ND2 to {ND2_target}")
-            kpfmot = ktl.cache('kpfmot')
-            kpfmot['ND2POS'].write(ND2_target)
+            log.info("  Setting ND2 to %s", ND2_target)
+            kpfmot = _SERVICES['kpfmot']
+            _write(kpfmot['ND2POS'], ND2_target, pending)
 
 
     def post_condition(self, args):
         ND2_target = args.get('ND2', None)
         if ND2_target is not None:
-            kpfmot = ktl.cache('kpfmot')
+            kpfmot = _SERVICES['kpfmot']
             final_pos = kpfmot['ND2POS'].read()
             if final_pos != ND2_target:
                 msg = f"Final ND2 position mismatch: {final_pos} != {ND2_target}"
@@ -495,6 +634,57 @@ class SetND2():
         self.post_condition(args)
 
 
+##-------------------------------------------------------------------------
+## SetNDFilters
+##-------------------------------------------------------------------------
+class SetNDFilters():
+    '''Set the filters in both the ND1 and ND2 filter wheels via the
+    `kpfmot.ND1POS` and `kpfmot.ND2POS` keywords.  Both moves are started
+    before waiting on either, so the wheels move at the same time.
+    '''
+    def __init__(self):
+        pass
+
+
+    def pre_condition(self, args):
+        pass
+
+
+    def perform(self, args, pending=None):
+        kpfmot = _SERVICES['kpfmot']
+        writes = [] if pending is None else pending
+        ND1_target = args.get('ND1', None)
+        if ND1_target is not None:
+            log.info("  Setting ND1 to %s", ND1_target)
+            _write(kpfmot['ND1POS'], ND1_target, writes)
+        ND2_target = args.get('ND2', None)
+        if ND2_target is not None:
+            log.info("  Setting ND2 to %s", ND2_target)
+            _write(kpfmot['ND2POS'], ND2_target, writes)
+        if pending is None:
+            for keyword, sequence in writes:
+                keyword.wait(sequence=sequence)
+
+
+    def post_condition(self, args):
+        kpfmot = _SERVICES['kpfmot']
+        for name in ('ND1', 'ND2'):
+            target = args.get(name, None)
+            if target is not None:
+                final_pos = kpfmot[f"{name}POS"].read()
+                if final_pos != target:
+                    msg = (f"Final {name} position mismatch: "
+                           f"{final_pos} != {target}")
+                    log.error(msg)
+                    raise KPFError(msg)
+        log.info('    Done')
+
+
+    def execute(self, args):
+        self.pre_condition(args)
+        self.perform(args)
+        self.post_condition(args)
+
 
 ##-------------------------------------------------------------------------
 ## SetTriggeredDetectors
@@ -512,50 +702,19 @@ class SetTriggeredDetectors():
 
 
     def perform(self, args):
-        detector_list = []
-        if args.get('TriggerRed', False) is True:
-            detector_list.append('Red')
-        if args.get('TriggerGreen', False) is True:
-            detector_list.append('Green')
-        if args.get('TriggerCaHK', False) is True:
-            detector_list.append('Ca_HK')
-
-        detectors_string = ','.join(detector_list)
-        log.info(f"  Setting triggered detectors to '{detectors_string}'")
-        kpfexpose = ktl.cache('kpfexpose')
+        mask = _selection_mask(args, '__trig_mask', _TRIG_TABLE)
+        detectors_string = _selection_string(mask, _TRIG_TABLE, _TRIG_STRINGS)
+        log.info("  Setting triggered detectors to '%s'", detectors_string)
+        kpfexpose = _SERVICES['kpfexpose']
         kpfexpose['TRIG_TARG'].write(detectors_string)
 
 
     def post_condition(self, args):
-        kpfexpose = ktl.cache('kpfexpose')
-        detectors = kpfexpose['TRIG_TARG'].read()
-        detector_list = detectors.split(',')
-
-        red_status = 'Red' in detector_list
-        red_target = args.get('TriggerRed', False)
-        if red_target != red_status:
-            msg = (f"Final Red detector trigger mismatch: "
-                   f"{red_status} != {red_target}")
-            log.error(msg)
-            raise KPFError(msg)
-
-        green_status = 'Green' in detector_list
-        green_target = args.get('TriggerGreen', False)
-        if green_target != green_status:
-            msg = (f"Final Green detector trigger mismatch: "
-                   f"{green_status} != {green_target}")
-            log.error(msg)
-            raise KPFError(msg)
-
-        CaHK_status = 'Ca_HK' in detector_list
-        CaHK_target = args.get('TriggerCaHK', False)
-        if CaHK_target != CaHK_status:
-            msg = (f"Final Ca HK detector trigger mismatch: "
-                   f"{CaHK_status} != {CaHK_target}")
-            log.error(msg)
-            raise KPFError(msg)
-
-        log.info(f"    Done")
+        kpfexpose = _SERVICES['kpfexpose']
+        mask = _selection_mask(args, '__trig_mask', _TRIG_TABLE)
+        _check_selection(kpfexpose['TRIG_TARG'], mask, _TRIG_TABLE,
+                         'detector trigger')
+        log.info("    Done")
 
 
     def execute(self, args):
@@ -579,70 +738,20 @@ class SetSourceSelectShutters():
         pass
 
 
-    def perform(self, args):
-        shutter_list = []
-        if args.get('SSS_Science', False) is True:
-            shutter_list.append('SciSelect')
-        if args.get('SSS_Sky', False) is True:
-            shutter_list.append('SkySelect')
-        if args.get('SSS_SoCalSci', False) is True:
-            shutter_list.append('SoCalSci')
-        if args.get('SSS_SoCalCal', False) is True:
-            shutter_list.append('SoCalCal')
-        if args.get('SSS_CalSciSky', False) is True:
-            shutter_list.append('Cal_SciSky')
-        shutters_string = ','.join(shutter_list)
-        log.info(f"  Setting source select shutters to '{shutters_string}'")
-        kpfexpose = ktl.cache('kpfexpose')
-        kpfexpose['SRC_SHUTTERS'].write(shutters_string)
+    def perform(self, args, pending=None):
+        mask = _selection_mask(args, '__sss_mask', _SSS_TABLE)
+        shutters_string = _selection_string(mask, _SSS_TABLE, _SSS_STRINGS)
+        log.info("  Setting source select shutters to '%s'", shutters_string)
+        kpfexpose = _SERVICES['kpfexpose']
+        _write(kpfexpose['SRC_SHUTTERS'], shutters_string, pending)
 
 
     def post_condition(self, args):
-        kpfexpose = ktl.cache('kpfexpose')
-        shutters = kpfexpose['SRC_SHUTTERS'].read()
-        shutter_list = shutters.split(',')
-
-        sci_shutter_status = 'SciSelect' in shutter_list
-        sci_shutter_target = args.get('SSS_Science', False)
-        if sci_shutter_target != sci_shutter_status:
-            msg = (f"Final Science select shutter mismatch: "
-                   f"{sci_shutter_status} != {sci_shutter_target}")
-            log.error(msg)
-            raise KPFError(msg)
-
-        sky_shutter_status = 'SkySelect' in shutter_list
-        sky_shutter_target = args.get('SSS_Sky', False)
-        if sky_shutter_target != sky_shutter_status:
-            msg = (f"Final Sky select shutter mismatch: "
-                   f"{sky_shutter_status} != {sky_shutter_target}")
-            log.error(msg)
-            raise KPFError(msg)
-
-        socalsci_shutter_status = 'SoCalSci' in shutter_list
-        socalsci_shutter_target = args.get('SSS_SoCalSci', False)
-        if socalsci_shutter_target != socalsci_shutter_status:
-            msg = (f"Final SoCalSci select shutter mismatch: "
-                   f"{socalsci_shutter_status} != {socalsci_shutter_target}")
-            log.error(msg)
-            raise KPFError(msg)
-
-        socalcal_shutter_status = 'SoCalCal' in shutter_list
-        socalcal_shutter_target = args.get('SSS_SoCalCal', False)
-        if socalcal_shutter_target != socalcal_shutter_status:
-            msg = (f"Final SoCalCal select shutter mismatch: "
-                   f"{socalcal_shutter_status} != {socalcal_shutter_target}")
-            log.error(msg)
-            raise KPFError(msg)
-
-        calscisky_shutter_status = 'Cal_SciSky' in shutter_list
-        calscisky_shutter_target = args.get('SSS_CalSciSky', False)
-        if calscisky_shutter_target != calscisky_shutter_status:
-            msg = (f"Final Cal_SciSky select shutter mismatch: "
-                   f"{calscisky_shutter_status} != {calscisky_shutter_target}")
-            log.error(msg)
-            raise KPFError(msg)
-
-        log.info(f"    Done")
+        kpfexpose = _SERVICES['kpfexpose']
+        mask = _selection_mask(args, '__sss_mask', _SSS_TABLE)
+        _check_selection(kpfexpose['SRC_SHUTTERS'], mask, _SSS_TABLE,
+                         'select shutter')
+        log.info("    Done")
 
 
     def execute(self, args):
@@ -666,62 +775,61 @@ class SetTimedShutters():
         pass
 
 
-    def perform(self, args):
-        # Scrambler 2 SimulCal 3 FF_Fiber 4 Ca_HK
-        timed_shutters_list = []
-        
-        if args.get('TS_Scrambler', False) is True:
-            timed_shutters_list.append('Scrambler')
-        if args.get('TS_SimulCal', False) is True:
-            timed_shutters_list.append('SimulCal')
-        if args.get('TS_FF_Fiber', False) is True:
-            timed_shutters_list.append('FF_Fiber')
-        if args.get('TS_CaHK', False) is True:
-            timed_shutters_list.append('Ca_HK')
-        timed_shutters_string = ','.join(timed_shutters_list)
-        log.info(f"  Setting timed shutters to '{timed_shutters_string}'")
-        kpfexpose = ktl.cache('kpfexpose')
-        kpfexpose['TIMED_SHUTTERS'].write(timed_shutters_string)
+    def perform(self, args, pending=None):
+        mask = _selection_mask(args, '__ts_mask', _TS_TABLE)
+        timed_shutters_string = _selection_string(mask, _TS_TABLE,
+                                                  _TS_STRINGS)
+        log.info("  Setting timed shutters to '%s'", timed_shutters_string)
+        kpfexpose = _SERVICES['kpfexpose']
+        _write(kpfexpose['TIMED_SHUTTERS'], timed_shutters_string,
+               pending)
 
 
     def post_condition(self, args):
-        kpfexpose = ktl.cache('kpfexpose')
-        shutters = kpfexpose['TIMED_SHUTTERS'].read()
-        shutter_list = shutters.split(',')
-
-        Scrambler_shutter_status = 'Scrambler' in shutter_list
-        Scrambler_shutter_target = args.get('TS_Scrambler', False)
-        if Scrambler_shutter_target != Scrambler_shutter_status:
-            msg = (f"Final Scrambler timed shutter mismatch: "
-                   f"{Scrambler_shutter_status} != {Scrambler_shutter_target}")
-            log.error(msg)
-            raise KPFError(msg)
+        kpfexpose = _SERVICES['kpfexpose']
+        mask = _selection_mask(args, '__ts_mask', _TS_TABLE)
+        _check_selection(kpfexpose['TIMED_SHUTTERS'], mask, _TS_TABLE,
+                         'timed shutter')
+        log.info("    Done")
 
-        SimulCal_shutter_status = 'SimulCal' in shutter_list
-        SimulCal_shutter_target = args.get('TS_SimulCal', False)
-        if SimulCal_shutter_target != SimulCal_shutter_status:
-            msg = (f"Final SimulCal timed shutter mismatch: "
-                   f"{SimulCal_shutter_status} != {SimulCal_shutter_target}")
-            log.error(msg)
-            raise KPFError(msg)
 
-        FF_Fiber_shutter_status = 'FF_Fiber' in shutter_list
-        FF_Fiber_shutter_target = args.get('TS_FF_Fiber', False)
-        if FF_Fiber_shutter_target != FF_Fiber_shutter_status:
-            msg = (f"Final FF_Fiber timed shutter mismatch: "
-                   f"{FF_Fiber_shutter_status} != {FF_Fiber_shutter_target}")
-            log.error(msg)
-            raise KPFError(msg)
+    def execute(self, args):
+        self.pre_condition(args)
+        self.perform(args)
+        self.post_condition(args)
 
-        Ca_HK_shutter_status = 'Ca_HK' in shutter_list
-        CA_HK_shutter_target = args.get('TS_CaHK', False)
-        if CA_HK_shutter_target != Ca_HK_shutter_status:
-            msg = (f"Final Ca_HK timed shutter mismatch: "
-                   f"{Ca_HK_shutter_status} != {CA_HK_shutter_target}")
-            log.error(msg)
-            raise KPFError(msg)
 
-        log.info(f"    Done")
+##-------------------------------------------------------------------------
+## BatchConfigureSequence
+##-------------------------------------------------------------------------
+class BatchConfigureSequence():
+    '''Sets the cal source, source select shutters, timed shutters, ND
+    filter wheels, and exposure time for a sequence.
+
+    All keyword writes are issued up front without waiting, so the
+    mechanisms move in parallel.  Once every write has completed, each
+    setting is verified using the post_condition of the individual action.
+    '''
+    def __init__(self):
+        self.actions = [_SET_CAL, _SET_SSS, _SET_TS, _SET_ND, _SET_EXPT]
+
+
+    def pre_condition(self, args):
+        pass
+
+
+    def perform(self, args):
+        pending = []
+        for action in self.actions:
+            action.perform(args, pending=pending)
+        for keyword, sequence in pending:
+            keyword.wait(sequence=sequence)
+
+
+    def post_condition(self, args):
+        for action in self.actions:
+            log.info("  Verifying %s", type(action).__name__)
+            action.post_condition(args)
 
 
     def execute(self, args):
@@ -730,6 +838,23 @@ class SetTimedShutters():
         self.post_condition(args)
 
 
+##-------------------------------------------------------------------------
+## Action instances shared by RunCalSequence
+##-------------------------------------------------------------------------
+_SET_CAL = SetCalSource()
+_SET_SSS = SetSourceSelectShutters()
+_SET_TS = SetTimedShutters()
+_SET_ND = SetNDFilters()
+_SET_EXPT = SetExptime()
+_WAIT_READY = WaitForReady()
+_SET_TRIG = SetTriggeredDetectors()
+_START_EXP = StartExposure()
+_WAIT_READOUT = WaitForReadout()
+_PWR_ON = PowerOnCalSource()
+_PWR_OFF = PowerOffCalSource()
+_BATCH_CONFIG = BatchConfigureSequence()
+
+
 ##-------------------------------------------------------------------------
 ## RunCalSequence
 ##-------------------------------------------------------------------------
@@ -746,97 +871,113 @@ class RunCalSequence():
     def __init__(self):
         pass
 
-    def pre_condition(self, args):
-        for file in args.files:
-            file = Path(file)
-            if file.exists() is False:
-                msg = f"Input file {args.file} does not exist"
-                log.info(msg)
-                raise FileNotFoundError(msg)
 
+    @staticmethod
+    def check_file(file):
+        try:
+            os.stat(file)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            msg = f"Input file {file} does not exist"
+            log.info(msg)
+            raise FileNotFoundError(msg)
 
-    def perform(self, args):
-        sequences = [yaml.load(open(file)) for file in args.files]
-        log.info(f"Read {len(sequences)} sequence files")
 
-        lamps = set([entry['OctagonSource'] for entry in sequences])
-        for lamp in lamps:
-            # Turn on lamps
-            action = PowerOnCalSource()
-            action.execute({'lamp': lamp})
+    @staticmethod
+    def load_file(file):
+        with open(file, 'rb') as f:
+            sequence = yaml.load(f, Loader=SafeLoader)
+        sequence['__trig_mask'] = _selection_mask(sequence, '__trig_mask',
+                                                  _TRIG_TABLE)
+        sequence['__sss_mask'] = _selection_mask(sequence, '__sss_mask',
+                                                 _SSS_TABLE)
+        sequence['__ts_mask'] = _selection_mask(sequence, '__ts_mask',
+                                                _TS_TABLE)
+        return sequence
 
-        warm_up_time = max([entry['WarmUp'] for entry in sequences])
 
-        log.info(f"Sleeping {warm_up_time:.0f} s for lamps to warm up")
-        sleep(warm_up_time)
+    def pre_condition(self, args):
+        if len(args.files) > 0:
+            with ThreadPoolExecutor(max_workers=min(8, len(args.files))) as ex:
+                list(ex.map(self.check_file, args.files))
 
-        for count in range(0,args.count):
-            for i,sequence in enumerate(sequences):
-                log.info(f"(Repeat {count+1}/{args.count}): Executing sequence "
-                         f"{i+1}/{len(sequences)} ({args.files[i]})")
 
-                # Set Cal Source
-                action = SetCalSource()
-                action.execute(sequence)
+    def perform(self, args):
+        sequences = []
+        if len(args.files) > 0:
+            with ThreadPoolExecutor(max_workers=min(8, len(args.files))) as ex:
+                sequences = list(ex.map(self.load_file, args.files))
+        log.info("Read %d sequence files", len(sequences))
+
+        lamps = sorted(set([entry['OctagonSource'] for entry in sequences]))
+        lamps = [lamp for lamp in lamps
+                 if PowerOnCalSource.ports.get(lamp) is not None]
+        # Turn on lamps.  The outlets are independent, so power them on
+        # concurrently and wait for all of them before starting the warm up.
+        if len(lamps) > 0:
+            with ThreadPoolExecutor(max_workers=len(lamps)) as ex:
+                list(ex.map(lambda lamp: _PWR_ON.execute({'lamp': lamp}),
+                            lamps))
 
-                # Set Source Select Shutters
-                action = SetSourceSelectShutters()
-                action.execute(sequence)
+        warm_up_time = max([entry['WarmUp'] for entry in sequences])
+        warmup_deadline = monotonic() + warm_up_time
 
-                # Set Timed Shutters
-                action = SetTimedShutters()
-                action.execute(sequence)
+        # Configure the instrument for the first sequence while lamps warm up
+        if len(sequences) > 0 and args.count > 0:
+            log.info("Configuring for sequence 1 during lamp warm up")
+            _BATCH_CONFIG.execute(sequences[0])
 
-                # Set ND1 Filter Wheel
-                action = SetND1()
-                action.execute(sequence)
+        remaining = max(0, warmup_deadline - monotonic())
+        log.info("Sleeping %.0f s for lamps to warm up", remaining)
+        sleep(remaining)
 
-                # Set ND2 Filter Wheel
-                action = SetND2()
-                action.execute(sequence)
+        for count in range(0,args.count):
+            for i,sequence in enumerate(sequences):
+                log.info("(Repeat %d/%d): Executing sequence %d/%d (%s)",
+                         count+1, args.count, i+1, len(sequences),
+                         args.files[i])
 
-                # Set exposure time
-                action = SetExptime()
-                action.execute(sequence)
+                # Set cal source, shutters, ND filters, and exposure time
+                if count > 0 or i > 0:
+                    _BATCH_CONFIG.execute(sequence)
 
-                # Wait for Exposure to be Complete
-                action = WaitForReady()
-                action.execute(sequence)
+                # Wait for Exposure to be Complete before changing the
+                # triggered detectors
+                if args.noexp is False:
+                    _WAIT_READY.execute(sequence)
 
                 # Set Detector List
-                action = SetTriggeredDetectors()
-                action.execute(sequence)
+                _SET_TRIG.execute(sequence)
 
                 nexp = sequence.get('nExp', 1)
-                for j in range(nexp):
-                    # Wait for Exposure to be Complete
-                    action = WaitForReady()
-                    action.execute(sequence)
+                if args.noexp is False:
+                    for j in range(nexp):
+                        # Wait for Exposure to be Complete.  The first
+                        # exposure is covered by the wait above.
+                        if j > 0:
+                            _WAIT_READY.execute(sequence)
 
-                    log.info(f"  Starting expoure {j+1}/{nexp}")
-                    # Start Exposure
-                    action = StartExposure()
-                    if args.noexp is False: action.execute(sequence)
+                        log.info("  Starting exposure %d/%d", j+1, nexp)
+                        # Start Exposure
+                        _START_EXP.execute(sequence)
 
-                    # Wait for Readout to Begin
-                    action = WaitForReadout()
-                    if args.noexp is False: action.execute(sequence)
+                        # Wait for Readout to Begin
+                        _WAIT_READOUT.execute(sequence)
 
 
         if args.lampsoff is True:
             for lamp in lamps:
                 # Turn off lamps
-                action = PowerOffCalSource()
-                action.execute({'lamp': lamp})
+                _PWR_OFF.execute({'lamp': lamp})
 
         # Wait for Exposure to be Complete
-        action = WaitForReady()
-        action.execute(sequence)
+        if args.noexp is False:
+            _WAIT_READY.execute({})
 
 
     def post_condition(self, args):
-        kpfexpose = ktl.cache('kpfexpose')
-        expose = kpfexpose['EXPOSE']
+        expose = _EXPOSE
         status = expose.read()
         if status != 'Ready':
             msg = f"Final detector state mismatch: {status} != Ready"